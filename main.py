@@ -1,16 +1,36 @@
 #!/usr/bin/env python3
 import asyncio
-import requests
-import time
+import contextlib
 import logging
 import hashlib
-from collections import OrderedDict
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+import heapq
+import json
+import os
+import re
+import sqlite3
+import sys
+import zstandard
+from collections import OrderedDict, defaultdict, deque
+from functools import lru_cache
+from itertools import islice
+try:
+  from lxml import etree  # C parser backend for BeautifulSoup and streaming link extraction
+except ImportError as e:
+  raise ImportError("lxml is required for HTML parsing: pip install -r requirements.txt") from e
+from urllib.parse import urljoin, urlparse, quote_plus
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent, Resource
-import hashlib
+
+def env_int(name: str, default: int, minimum: int) -> int:
+  """Read an integer setting from the environment, clamped to minimum"""
+  value = os.environ.get(name)
+  if value is None:
+    return default
+  try:
+    return max(minimum, int(value))
+  except ValueError:
+    raise ValueError(f"{name} must be an integer, got {value!r}") from None
 
 # ========== CONFIGURATION - ONLY UPDATE THESE ==========
 DRUPAL_BASE_URL   = "https://docs.acquia.com/"
@@ -28,9 +48,12 @@ MAIN_DOC_URLS     = [
   "https://docs.acquia.com/web-governance/overview"
 ]
 MAX_CRAWL_DEPTH       = 5    # Increased depth for better deep page discovery
-CACHE_SIZE            = 1000 # Larger cache for more comprehensive coverage
-REQUEST_DELAY         = 0.5  # Conservative rate limiting
+CACHE_SIZE            = env_int("ACQUIA_DOCS_CACHE_SIZE", 1000, minimum=1)  # Pages kept in memory (LRU)
+REQUEST_DELAY         = 0.5  # Backoff before retrying a failed crawl request (seconds)
+CRAWL_CONCURRENCY     = 8    # Upper bound on in-flight requests while crawling
+CACHE_DB_PATH         = os.environ.get("ACQUIA_DOCS_CACHE_DB") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "docs_cache.sqlite3")  # Persistent page store
 MAX_PAGES_PER_PRODUCT = 75   # Increased limit for better coverage
+LIST_PAGE_SIZE        = 100  # URLs list_cached_urls returns per call unless a limit is given
 
 # Demo-specific Memcached documentation - Pre-loaded for instant access
 MEMCACHED_DOC_URL = "https://docs.acquia.com/acquia-cloud-platform/enabling-memcached-cloud-platform"
@@ -88,19 +111,71 @@ For Cloud Next, you do not need to add anything to your settings.php file as the
 Source: https://docs.acquia.com/acquia-cloud-platform/enabling-memcached-cloud-platform
 """
 
+# Sentences end at terminal punctuation followed by whitespace, so URLs and
+# version numbers stay intact; extracted text also puts every block on its own line
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+|\n')
+
+def add_search_text(page_data: dict) -> dict:
+  """Store the lowercased title and content, paragraphs and sentences on page_data
+  so searches do not lowercase or split the whole page again for every query"""
+  content = page_data['content']
+  page_data['title_lower'] = page_data['title'].lower()
+  page_data['content_lower'] = content.lower()
+  page_data['paragraphs'] = [p for p in (line.strip() for line in content.split('\n')) if len(p) > 30]
+  page_data['sentences'] = SENTENCE_SPLIT_RE.split(content)
+  return page_data
+
+def extract_code_snippet(content: str, fence: str = '```php') -> str:
+  """Return the first fenced code block of the given type, or an empty string"""
+  code_start = content.find(fence)
+  code_end = content.find('```', code_start + len(fence))
+  if code_start == -1 or code_end == -1:
+    return ""
+  return content[code_start:code_end + 3]
+
+# The settings.php snippet quoted in guidance responses never changes - extract it once
+MEMCACHED_SETTINGS_SNIPPET = extract_code_snippet(MEMCACHED_DOC_CONTENT)
+
+# The Memcached doc is a constant, so its resource text and search text are built once as well
+MEMCACHED_DOC_TITLE = 'Enabling Memcached on Cloud Platform'
+MEMCACHED_RESOURCE_TEXT = f"# {MEMCACHED_DOC_TITLE}\n\nSource: {MEMCACHED_DOC_URL}\n\n{MEMCACHED_DOC_CONTENT}"
+MEMCACHED_DOC_DATA = add_search_text({
+  'url': MEMCACHED_DOC_URL,
+  'title': MEMCACHED_DOC_TITLE,
+  'content': MEMCACHED_DOC_CONTENT,
+  'links': [],
+  'success': True
+})
+
+# Extra context get_source_link appends for Memcached-related queries
+MEMCACHED_SOURCE_CONTEXT = (
+  f"**Topic:** Memcached Integration for Cloud Classic\n"
+  f"**Documentation Title:** {MEMCACHED_DOC_TITLE}\n"
+  f"**Direct Link:** {MEMCACHED_DOC_URL}\n\n"
+  "This documentation contains the official Acquia guidance for:\n"
+  "• Installing the Memcache module via Composer\n"
+  "• Adding acquia/memcache-settings package\n"
+  "• Configuring settings.php with the proper require_once statement\n"
+  "• Cloud Classic vs Cloud Next differences\n"
+)
+
+def acquia_search_url(query: str) -> str:
+  """Build an Acquia docs search URL for a query"""
+  return f"{DRUPAL_BASE_URL}search/?q={quote_plus(query)}"
+
 # Additional tool to get source links for any query
-def get_source_links_for_query(query: str) -> str:
+async def get_source_links_for_query(query: str) -> str:
   """Get the official source documentation links for a given query"""
   if is_memcached_related_query(query):
       return MEMCACHED_DOC_URL
   
   # For other queries, try to find the most relevant documentation URL
-  results = direct_search_docs(query)
+  results = await direct_search_docs(query)
   if results and results[0]['url']:
       return results[0]['url']
   
   # Fallback to general search
-  return f"https://docs.acquia.com/search/?q={requests.utils.quote(query)}"
+  return acquia_search_url(query)
 # =======================================================
 
 # Set up logging
@@ -110,157 +185,468 @@ logger = logging.getLogger(__name__)
 app = Server("drupal-docs")
 
 # In-memory cache for crawled pages
-page_cache = {}  # URL -> page_data mapping
-url_to_cache_key = {}  # URL -> cache_key mapping for quick lookup
-discovered_urls = set()
+page_cache = OrderedDict()  # URL -> page_data mapping, least recently used first
+parsed_pages = OrderedDict()  # sha256(body) -> (title, content), shared by identical pages
+tool_output_cache = {}  # tool name -> rendered listing of page_cache, cleared whenever page_cache changes
+product_index = {}  # product -> OrderedDict(url -> title), kept in page_cache order
+
+# Shared HTTP session - created lazily so connections to docs.acquia.com are reused.
+# aiohttp itself is imported on first use too: it is the largest import after mcp and
+# start-up, resource reads and memcached lookups never touch the network.
+_session = None  # aiohttp.ClientSession
+
+async def get_session():
+  """Return the shared aiohttp session, creating it on first use"""
+  import aiohttp
+  global _session
+  if _session is None or _session.closed:
+    # Every request goes to one host: cache its DNS answer and keep TLS connections warm
+    connector = aiohttp.TCPConnector(
+      limit=20,
+      limit_per_host=CRAWL_CONCURRENCY,
+      ttl_dns_cache=300,
+      keepalive_timeout=60,
+      force_close=False,
+      enable_cleanup_closed=True
+    )
+    _session = aiohttp.ClientSession(
+      connector=connector,
+      timeout=aiohttp.ClientTimeout(total=30, connect=10),
+      headers={
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate',
+        'Referer': DRUPAL_BASE_URL,
+      }
+    )
+  return _session
+
+# Gateway errors are usually transient, so they are retried with exponential backoff
+RETRY_STATUSES = frozenset({502, 503, 504})
+MAX_RETRIES    = 2
+RETRY_BACKOFF  = 0.3  # seconds, doubled on every retry
+
+async def get_with_retries(url: str, **kwargs):
+  """GET url on the shared session, retrying gateway errors - the caller releases the response"""
+  session = await get_session()
+  for attempt in range(MAX_RETRIES):
+    response = await session.get(url, **kwargs)
+    if response.status not in RETRY_STATUSES:
+      return response
+    response.release()
+    logger.info("Retrying %s after HTTP %s", url, response.status)
+    await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+  return await session.get(url, **kwargs)
+
+# Persistent page store - remembers ETag/Last-Modified validators and parsed pages so
+# re-crawls can send conditional GETs and reuse the stored page on 304 Not Modified.
+# Parsed pages are zstd-compressed and keyed by the SHA-256 of the response body, so
+# identical pages served under several URLs share a single stored document.
+_db = None  # sqlite3.Connection
+_zstd_compressor = zstandard.ZstdCompressor(level=3)
+_zstd_decompressor = zstandard.ZstdDecompressor()
+
+def get_db() -> sqlite3.Connection:
+  """Return the page store connection, creating the schema on first use"""
+  global _db
+  if _db is None:
+    _db = sqlite3.connect(CACHE_DB_PATH)
+    _db.execute("PRAGMA journal_mode=WAL")
+    _db.execute("PRAGMA synchronous=NORMAL")
+    _db.execute(
+      "CREATE TABLE IF NOT EXISTS urls ("
+      "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, sha256 BLOB, links TEXT)"
+    )
+    _db.execute("CREATE TABLE IF NOT EXISTS documents (sha256 BLOB PRIMARY KEY, parsed BLOB)")
+  return _db
+
+def load_validators(url: str):
+  """Return (etag, last_modified) for a stored page, or None"""
+  try:
+    return get_db().execute(
+      "SELECT urls.etag, urls.last_modified FROM urls "
+      "JOIN documents ON documents.sha256 = urls.sha256 WHERE urls.url = ?", (url,)
+    ).fetchone()
+  except sqlite3.Error as e:
+    logger.warning("Page store read failed for %s: %s", url, e)
+    return None
+
+def load_stored_page(url: str):
+  """Return the stored page_data for a URL, or None"""
+  try:
+    row = get_db().execute(
+      "SELECT urls.links, documents.parsed FROM urls "
+      "JOIN documents ON documents.sha256 = urls.sha256 WHERE urls.url = ?", (url,)
+    ).fetchone()
+    if row is None:
+      return None
+    links, parsed = row
+    page_data = json.loads(_zstd_decompressor.decompress(parsed))
+    page_data['links'] = json.loads(links)
+  except (sqlite3.Error, zstandard.ZstdError, ValueError) as e:
+    logger.warning("Page store read failed for %s: %s", url, e)
+    return None
+  return page_data
+
+def forget_stored_page(url: str):
+  """Drop a URL's validators and stored document so its next fetch downloads and stores it afresh"""
+  try:
+    db = get_db()
+    db.execute("DELETE FROM documents WHERE sha256 = (SELECT sha256 FROM urls WHERE url = ?)", (url,))
+    db.execute("DELETE FROM urls WHERE url = ?", (url,))
+    db.commit()
+  except sqlite3.Error as e:
+    logger.warning("Page store write failed for %s: %s", url, e)
+
+def store_page(url: str, etag: str, last_modified: str, digest: bytes, page_data: dict):
+  """Persist a page with its validators - pages without validators are not stored"""
+  if not etag and not last_modified:
+    return
+  try:
+    db = get_db()
+    if db.execute("SELECT 1 FROM documents WHERE sha256 = ?", (digest,)).fetchone() is None:
+      parsed = json.dumps({'title': page_data['title'], 'content': page_data['content']})
+      db.execute(
+        "INSERT INTO documents (sha256, parsed) VALUES (?, ?)",
+        (digest, _zstd_compressor.compress(parsed.encode()))
+      )
+    db.execute(
+      "INSERT OR REPLACE INTO urls (url, etag, last_modified, sha256, links) VALUES (?, ?, ?, ?, ?)",
+      (url, etag, last_modified, digest, json.dumps(page_data['links']))
+    )
+    db.commit()
+  except sqlite3.Error as e:
+    logger.warning("Page store write failed for %s: %s", url, e)
+
+def close_db():
+  """Drop documents no URL points to any more and close the page store connection"""
+  global _db
+  if _db is not None:
+    try:
+      _db.execute("DELETE FROM documents WHERE sha256 NOT IN (SELECT sha256 FROM urls)")
+      _db.commit()
+    except sqlite3.Error as e:
+      logger.warning("Page store cleanup failed: %s", e)
+    _db.close()
+  _db = None
+
+async def close_session():
+  """Close the shared aiohttp session"""
+  global _session
+  if _session is not None and not _session.closed:
+    await _session.close()
+  _session = None
+
+# URL helpers - the same hrefs recur on nearly every crawled page, so parsing and
+# joining are memoized instead of re-tokenizing each URL
+DRUPAL_BASE_NETLOC = urlparse(DRUPAL_BASE_URL).netloc
+
+@lru_cache(maxsize=8192)
+def cached_urlparse(url: str):
+  """Memoized urllib.parse.urlparse"""
+  return urlparse(url)
 
+@lru_cache(maxsize=8192)
+def cached_urljoin(base: str, ref: str) -> str:
+  """Memoized urllib.parse.urljoin"""
+  return urljoin(base, ref)
+
+# is_docs_url exclusions - be specific to avoid blocking legitimate docs
+EXCLUDED_PATH_PATTERNS = (
+  '/user/login', '/user/register', '/user/password', '/user/logout',
+  '/admin/', '/taxonomy/term/', '/node/add',
+  '/contact', '/rss.xml', '/sitemap.xml'
+)
+PROBLEM_PATH_PATTERNS = ('/themes/', '/modules/', '/core/', '/sites/default')
+EXCLUDED_EXTENSIONS = ('jpg', 'jpeg', 'png', 'gif', 'pdf', 'zip', 'tar.gz', 'css', 'js')
+# All of the above as one pattern, so a path is checked in a single regex pass
+EXCLUDED_PATH_RE = re.compile('|'.join(
+  [re.escape(pattern) for pattern in EXCLUDED_PATH_PATTERNS + PROBLEM_PATH_PATTERNS] +
+  [r'\.(?:' + '|'.join(re.escape(ext) for ext in EXCLUDED_EXTENSIONS) + r')$']
+))
+
+@lru_cache(maxsize=65536)
 def is_docs_url(url: str) -> bool:
   """Check if URL is an Acquia documentation page - more inclusive for deep pages"""
-  parsed = urlparse(url)
+  parsed = cached_urlparse(url)
   
   # Basic domain check
-  if parsed.netloc != urlparse(DRUPAL_BASE_URL).netloc:
+  if parsed.netloc != DRUPAL_BASE_NETLOC:
     return False
   
   path_lower = parsed.path.lower()
   
-  # Quick exclusions - be more specific to avoid blocking legitimate docs
-  excluded_patterns = [
-    '/user/login', '/user/register', '/user/password', '/user/logout',
-    '/admin/', '/taxonomy/term/', '/node/add',
-    '/contact', '/rss.xml', '/sitemap.xml'
-  ]
-  
-  excluded_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.pdf', '.zip', '.tar.gz', '.css', '.js']
-  
-  # Check for exact excluded patterns (not just contains)
-  for pattern in excluded_patterns:
-    if pattern in path_lower:
-      return False
-  
-  if any(path_lower.endswith(ext) for ext in excluded_extensions):
+  # Much more inclusive - accept most paths under docs.acquia.com and exclude
+  # only account/admin pages, feeds, static assets and theme/module files
+  if EXCLUDED_PATH_RE.search(path_lower):
     return False
   
-  # Remove fragment and query parameters but keep the URL valid
-  if path_lower.startswith('/') and len(path_lower) > 1:
-    # Much more inclusive - accept most paths under docs.acquia.com
-    # Exclude only specific problem patterns, include everything else
-    problem_patterns = ['/themes/', '/modules/', '/core/', '/sites/default']
-    if not any(pattern in path_lower for pattern in problem_patterns):
-      return True
-  
-  return False
+  return path_lower.startswith('/') and len(path_lower) > 1
 
 def add_to_cache(url: str, page_data: dict):
-    """Add page to cache with FIFO eviction when cache is full"""
-    if len(page_cache) >= CACHE_SIZE:
-        # Remove oldest entry (FIFO)
-        oldest_url = next(iter(page_cache))
-        del page_cache[oldest_url]
-        if oldest_url in url_to_cache_key:
-            del url_to_cache_key[oldest_url]
+    """Add page to cache with LRU eviction when cache is full"""
+    tool_output_cache.clear()
+    product = get_product_area(url)
+    if url in page_cache:
+        page_cache.move_to_end(url)
+        product_index[product].move_to_end(url)
+    elif len(page_cache) >= CACHE_SIZE:
+        # Remove least recently used entry
+        evicted_url, evicted = page_cache.popitem(last=False)
+        product_pages = product_index[evicted['product']]
+        del product_pages[evicted_url]
+        if not product_pages:
+            del product_index[evicted['product']]
     
+    page_data['product'] = product
     page_cache[url] = page_data
-    url_to_cache_key[url] = hashlib.md5(url.encode()).hexdigest()[:8]
+    product_index.setdefault(product, OrderedDict())[url] = page_data['title']
+
+def get_cached_page(url: str):
+  """Return the cached page_data for url and mark it recently used, or None"""
+  page_data = page_cache.get(url)
+  if page_data is not None:
+    page_cache.move_to_end(url)
+    product_index[page_data['product']].move_to_end(url)
+    tool_output_cache.clear()  # listings follow page_cache order
+  return page_data
+
+# Page chrome stripped before extracting text
+CHROME_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe']
 
-def fetch_page(url: str) -> dict:
-  """Fetch and parse a page"""
+# Content containers and title elements in priority order - the first selector with
+# any match wins. Each selector is (tag, attribute, value); attribute None matches any tag.
+CONTENT_SELECTORS = (
+  ('div', 'class', 'node__content'),
+  ('div', 'class', 'field--name-body'),
+  ('div', 'class', 'field-item'),
+  ('article', None, None),
+  ('main', None, None),
+  ('div', 'class', 'content'),
+  ('div', 'id', 'content'),
+  ('div', 'class', 'region-content'),
+  ('div', 'class', 'block-system-main-block'),
+  ('div', 'class', 'layout-content'),
+  ('section', 'class', 'block-layout-builder'),
+  ('div', 'class', 'views-element-container'),
+)
+TITLE_SELECTORS = (
+  ('h1', 'class', 'page-title'),
+  ('h1', 'class', 'title'),
+  ('h1', None, None),
+)
+
+# hrefs that can never lead to another documentation page
+NON_PAGE_HREF_RE = re.compile(r'^\s*(?:#|mailto:|javascript:|tel:)', re.IGNORECASE)
+
+def find_first(soup, selectors):
+  """Return the first element in document order matching the highest-priority selector.
+  
+  Equivalent to trying soup.find() for each selector in turn, but walks the tree once
+  instead of once per selector that misses."""
+  best, best_rank = None, len(selectors)
+  for elem in soup.descendants:
+    name = elem.name
+    if name is None:  # Text node
+      continue
+    # Only selectors ranked above the current best can replace it
+    for rank in range(best_rank):
+      tag, attr, value = selectors[rank]
+      if name != tag:
+        continue
+      if attr == 'class':
+        if value not in elem.get('class', ()):
+          continue
+      elif attr is not None and elem.get(attr) != value:
+        continue
+      best, best_rank = elem, rank
+      break
+    if best_rank == 0:
+      break
+  return best
+
+# bs4 is only imported once a page actually needs parsing, keeping it off the
+# MCP server's start-up path
+@lru_cache(maxsize=None)
+def link_strainer():
+  """SoupStrainer keeping only <a href> tags"""
+  from bs4 import SoupStrainer
+  return SoupStrainer('a', href=True)
+
+@lru_cache(maxsize=None)
+def content_strainer():
+  """SoupStrainer keeping <title> and the whole <body>, skipping the rest of <head>.
+  
+  Whole subtrees are kept on purpose: straining to inner containers would detach
+  them from chrome parents like <nav> or <aside> that the decompose pass removes."""
+  from bs4 import SoupStrainer
+  return SoupStrainer(['title', 'body'])
+
+def extract_content(body: bytes, head_title: str = None, encoding: str = None) -> tuple:
+  """Parse a page body and return its (title, content_text).
+  
+  head_title is the page's <title> text, captured while streaming, and is used
+  when the body has no suitable <h1>. encoding is the response charset, if any."""
+  from bs4 import BeautifulSoup
+  soup = BeautifulSoup(body, 'lxml', parse_only=content_strainer(), from_encoding=encoding)
+  
+  for element in soup(CHROME_TAGS):
+    element.decompose()
+      
+  # Try multiple content selectors for better content extraction
+  content_elem = find_first(soup, CONTENT_SELECTORS)
+  
+  content_text = content_elem.get_text(strip=True, separator='\n') if content_elem else soup.get_text(strip=True, separator='\n')
+  
+  # Better title extraction
+  title_elem = find_first(soup, TITLE_SELECTORS)
+  if title_elem is not None:
+    title = title_elem.get_text(strip=True)
+  else:
+    title = head_title if head_title is not None else "Untitled"
+  if " | " in title:
+    title = title.split(" | ")[0].strip()
+      
+  return title, content_text
+
+def collect_stream_events(parser, hrefs: list, titles: list):
+  """Collect hrefs from <a> and text from <title> elements the pull parser has
+  finished, then release them"""
+  for _, elem in parser.read_events():
+    if elem.tag == 'title':
+      titles.append((elem.text or '').strip())
+    else:
+      href = elem.get('href')
+      if href:
+        hrefs.append(href)
+    elem.clear(keep_tail=True)
+
+MAX_RESPONSE_BYTES = 5 * 1024 * 1024  # 5MB limit per page
+
+async def fetch_page(url: str, limiter: "AdaptiveLimiter" = None) -> dict:
+  """Fetch and parse a page, reporting the time-to-headers of full responses to limiter"""
+  import aiohttp
   try:
-    if url in page_cache:
-      return page_cache[url]
+    cached = get_cached_page(url)
+    if cached is not None:
+      return cached
         
-    headers = {
-      'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-      'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-      'Accept-Language': 'en-US,en;q=0.9',
-      'Referer': DRUPAL_BASE_URL,
-    }
+    headers = {}
     
-    response = requests.get(url, headers=headers, timeout=15)
-    response.raise_for_status()
+    # Revalidate pages we have seen before instead of downloading them again
+    # Only the validators are read here - the stored document is decompressed
+    # only when the server answers 304
+    validators = load_validators(url)
+    if validators is not None:
+      etag, last_modified = validators
+      if etag:
+        headers['If-None-Match'] = etag
+      if last_modified:
+        headers['If-Modified-Since'] = last_modified
     
-    # Add response size check to prevent memory issues
-    if len(response.content) > 5 * 1024 * 1024:  # 5MB limit
-      raise ValueError("Response too large")
-        
-    soup = BeautifulSoup(response.text, 'html.parser')
+    hrefs = []
+    titles = []
+    chunks = []
     
-    for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe']):
-      element.decompose()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    response = await get_with_retries(url, headers=headers, timeout=aiohttp.ClientTimeout(total=15))
+    if response.status == 304 and validators is not None:
+      async with response:
+        stored = load_stored_page(url)
+      if stored is not None:
+        result = add_search_text(dict(stored, url=url, success=True))
+        add_to_cache(url, result)
+        return result
+      # The stored page is unreadable - download it in full rather than sending
+      # the same validators and getting the same 304 forever
+      forget_stored_page(url)
+      start = loop.time()
+      response = await get_with_retries(url, timeout=aiohttp.ClientTimeout(total=15))
+    async with response:
+      # Only full responses are comparable samples - 304s and errors return early
+      # and download/parse time says nothing about how loaded the server is
+      if limiter is not None and response.status == 200:
+        limiter.record(loop.time() - start)
+      response.raise_for_status()
+      # Add response size check to prevent memory issues - oversized pages are
+      # abandoned as soon as they cross the limit instead of after downloading
+      if (response.content_length or 0) > MAX_RESPONSE_BYTES:
+        raise ValueError("Response too large")
+      etag = response.headers.get('ETag')
+      last_modified = response.headers.get('Last-Modified')
+      # Links and the <title> are pulled out of the HTML while it downloads, so no
+      # tree is built for them and the content parse can skip <head> entirely.
+      # A Content-Type charset wins over sniffing, as it would for response.text()
+      encoding = response.charset
+      try:
+        stream_parser = etree.HTMLPullParser(events=('end',), tag=('a', 'title'), encoding=encoding)
+      except LookupError:
+        encoding = None  # Charset unknown to libxml2 - let the parsers sniff it
+        stream_parser = etree.HTMLPullParser(events=('end',), tag=('a', 'title'))
+      total_bytes = 0
+      async for chunk in response.content.iter_chunked(32768):
+        total_bytes += len(chunk)
+        if total_bytes > MAX_RESPONSE_BYTES:
+          raise ValueError("Response too large")
+        chunks.append(chunk)
+        stream_parser.feed(chunk)
+        collect_stream_events(stream_parser, hrefs, titles)
+    try:
+      stream_parser.close()
+    except etree.XMLSyntaxError:
+      pass  # Empty or unparseable document - no links
+    collect_stream_events(stream_parser, hrefs, titles)
+    body = b''.join(chunks)
         
-    # Try multiple content selectors for better content extraction
-    content_elem = (
-      soup.find('div', class_='node__content') or
-      soup.find('div', class_='field--name-body') or
-      soup.find('div', class_='field-item') or
-      soup.find('article') or
-      soup.find('main') or
-      soup.find('div', class_='content') or
-      soup.find('div', id='content') or
-      soup.find('div', class_='region-content') or
-      soup.find('div', class_='block-system-main-block') or
-      soup.find('div', class_='layout-content') or
-      soup.find('section', class_='block-layout-builder') or
-      soup.find('div', class_='views-element-container')
-    )
-    
-    content_text = content_elem.get_text(strip=True, separator='\n') if content_elem else soup.get_text(strip=True, separator='\n')
-    
-    # Better title extraction
-    title_elem = (
-      soup.find('h1', class_='page-title') or
-      soup.find('h1', class_='title') or
-      soup.find('h1') or
-      soup.find('title')
-    )
-    title = title_elem.get_text(strip=True) if title_elem else "Untitled"
-    if " | " in title:
-      title = title.split(" | ")[0].strip()
+    # Identical bodies (e.g. aliased or versioned URLs) are only parsed once
+    digest = hashlib.sha256(body).digest()
+    parsed = parsed_pages.get(digest)
+    if parsed is None:
+      # The tree build is CPU-bound; run it off the event loop so the other
+      # in-flight downloads keep streaming meanwhile
+      parsed = await asyncio.to_thread(extract_content, body, titles[0] if titles else None, encoding)
+      parsed_pages[digest] = parsed
+      if len(parsed_pages) > CACHE_SIZE:
+        parsed_pages.popitem(last=False)
+    else:
+      parsed_pages.move_to_end(digest)
+    title, content_text = parsed
         
-    # Enhanced link extraction - look for more types of navigation
+    # Enhanced link extraction - every <a href> seen while streaming, including
+    # navigation, sidebar and menu links. Kept in page order, each URL once.
+    # Menus repeat the same hrefs many times, so each distinct href is resolved once.
     links = []
-    
-    # Main content links
-    for a_tag in soup.find_all('a', href=True):
-      href = a_tag['href']
-      full_url = urljoin(url, href)
+    seen_links = {url}
+    seen_hrefs = set()
+    for href in hrefs:
+      if href in seen_hrefs:
+        continue
+      seen_hrefs.add(href)
+      if NON_PAGE_HREF_RE.match(href):
+        continue
+      full_url = cached_urljoin(url, href)
       # Clean URL but preserve query params that might be important
-      full_url = full_url.split('#')[0]
-      if is_docs_url(full_url) and full_url != url:
+      if '#' in full_url:
+        full_url = full_url.split('#', 1)[0]
+      if full_url not in seen_links:
+        seen_links.add(full_url)
+        if is_docs_url(full_url):
           links.append(full_url)
-          discovered_urls.add(full_url)
-            
-    # Enhanced navigation selectors for better link discovery
-    nav_selectors = [
-      'nav a', '.menu a', '.sidebar a', '.navigation a', 
-      '.toc a', '.table-of-contents a', '.book-navigation a',
-      '.region-sidebar a', '.block-menu a', '.breadcrumb a',
-      '.pager a', '.item-list a', '.view-content a',
-      '.field--name-field-related-content a',
-      '.block-views a', '.views-row a'
-    ]
-    
-    for selector in nav_selectors:
-      for a_tag in soup.select(selector):
-        if a_tag.get('href'):
-          href = a_tag['href']
-          full_url = urljoin(url, href)
-          full_url = full_url.split('#')[0]
-          if is_docs_url(full_url) and full_url != url and full_url not in links:
-            links.append(full_url)
-            discovered_urls.add(full_url)
                     
-    result = {
+    result = add_search_text({
       'url': url,
       'title': title,
       'content': content_text,
-      'links': list(set(links)),
+      'links': links,
       'success': True
-    }
+    })
     
     add_to_cache(url, result)
+    store_page(url, etag, last_modified, digest, result)
     return result
-  except requests.exceptions.RequestException as e:
+  except (aiohttp.ClientError, asyncio.TimeoutError) as e:
     return {
       'url': url,
       'title': 'Network Error',
@@ -277,153 +663,191 @@ def fetch_page(url: str) -> dict:
       'success': False
     }
 
-def crawl_docs(start_urls: list = None, max_depth: int = 4) -> dict:
-  """Crawl documentation site comprehensively"""
+class AdaptiveLimiter:
+  """Vegas-style concurrency limiter: widens while response times stay close to the
+  low end of recent response times and backs off when requests start queueing at the server"""
+
+  def __init__(self, initial: int, max_limit: int, tolerance: float = 2.0):
+    self.limit = float(initial)
+    self.max_limit = max_limit
+    self.tolerance = tolerance
+    self.in_flight = 0
+    self._samples = deque(maxlen=100)  # Recent time-to-headers in seconds
+    self._cond = asyncio.Condition()
+
+  @contextlib.asynccontextmanager
+  async def acquire(self):
+    """Hold one request slot"""
+    async with self._cond:
+      await self._cond.wait_for(lambda: self.in_flight < self.limit)
+      self.in_flight += 1
+    try:
+      yield
+    finally:
+      async with self._cond:
+        self.in_flight -= 1
+        self._cond.notify_all()
+
+  def record(self, elapsed: float):
+    """Adjust the limit from one request's time-to-headers"""
+    self._samples.append(elapsed)
+    if len(self._samples) < 10:
+      return  # Too few samples for a stable baseline
+    # The 10th percentile rather than the minimum, so one unusually fast
+    # response cannot set a baseline every later request looks slow against
+    baseline = sorted(self._samples)[len(self._samples) // 10]
+    if elapsed > baseline * self.tolerance:
+      self.limit = max(1.0, self.limit * 0.75)  # Server is queueing - back off
+    else:
+      self.limit = min(self.max_limit, self.limit + 1 / self.limit)  # ~+1 per round trip
+
+# Links queued from each crawled page
+SAME_PRODUCT_LINKS_PER_PAGE  = 25
+OTHER_PRODUCT_LINKS_PER_PAGE = 8
+
+async def crawl_docs(start_urls: list = None, max_depth: int = 4) -> dict:
+  """Crawl documentation site comprehensively, one concurrent crawler per product area"""
   if start_urls is None:
       start_urls = [DRUPAL_DOCS_START] + MAIN_DOC_URLS
-  visited = set()
-  to_visit = [(url, 0, 'main') for url in start_urls]
+  start_urls = list(dict.fromkeys(start_urls))
+  seen = set(start_urls)  # Every URL ever queued - marked on enqueue so each is fetched once
   all_pages = {}
-  product_page_counts = {}
-  logger.info(f"Starting comprehensive crawl of {len(start_urls)} product areas...")
-  while to_visit:
-    url, depth, product_hint = to_visit.pop(0)
-    if url in visited or depth > max_depth:
-      continue
+  product_page_counts = defaultdict(int)
+  limiter = AdaptiveLimiter(initial=2, max_limit=CRAWL_CONCURRENCY)  # Politeness limit for docs.acquia.com
+  logger.info("Starting comprehensive crawl of %d product areas...", len(start_urls))
+
+  async def crawl_page(url: str, depth: int, frontier: asyncio.Queue):
+    if depth > max_depth:
+      return
     product_area = get_product_area(url)
-    if product_area not in product_page_counts:
-        product_page_counts[product_area] = 0
     if product_page_counts[product_area] >= MAX_PAGES_PER_PRODUCT:
-      continue
-    visited.add(url)
+      return
     product_page_counts[product_area] += 1
-    logger.info(f"Crawling [{product_area}]: {url} (depth {depth}, page {product_page_counts[product_area]})")
-    
-    if len(visited) > 1:
-      time.sleep(REQUEST_DELAY)
-    page_data = fetch_page(url)
-    if page_data['success']:
-      all_pages[url] = page_data
-        
-      # Prioritize links from the same product area for deeper crawling
-      if depth < max_depth:
-        same_product_links = []
-        other_links = []
-        for link in page_data['links']:
-          if link not in visited and link not in [item[0] for item in to_visit]:
-            link_product = get_product_area(link)
-            if link_product == product_area:
-              same_product_links.append(link)
-            else:
-              other_links.append(link)
-        
-        # Add more links from same product, fewer from others
-        for link in same_product_links[:25]:  # Increased from 20
-          to_visit.append((link, depth + 1, product_area))
-        for link in other_links[:8]:  # Increased from 5
-          to_visit.append((link, depth + 1, get_product_area(link)))
-      else:
-        logger.warning(f"Failed to fetch: {url} - {page_data['content']}")
-  
-  logger.info(f"Crawling completed! Summary:")
+    logger.info("Crawling [%s]: %s (depth %d, page %d)", product_area, url, depth, product_page_counts[product_area])
+
+    page_data = page_cache.get(url)
+    if page_data is None:
+      async with limiter.acquire():
+        page_data = await fetch_page(url, limiter)
+      if not page_data['success']:
+        # Back off once before retrying against the same host
+        await asyncio.sleep(REQUEST_DELAY)
+        async with limiter.acquire():
+          page_data = await fetch_page(url, limiter)
+    if not page_data['success']:
+      logger.warning("Failed to fetch: %s - %s", url, page_data['content'])
+      return
+    all_pages[url] = page_data
+
+    # Prioritize links from the same product area for deeper crawling
+    if depth < max_depth:
+      # Add more links from same product, fewer from others
+      same_product_links = []
+      other_links = []
+      for link in page_data['links']:
+        if link in seen:
+          continue
+        if get_product_area(link) == product_area:
+          if len(same_product_links) < SAME_PRODUCT_LINKS_PER_PAGE:
+            same_product_links.append(link)
+        elif len(other_links) < OTHER_PRODUCT_LINKS_PER_PAGE:
+          other_links.append(link)
+        if len(same_product_links) >= SAME_PRODUCT_LINKS_PER_PAGE and len(other_links) >= OTHER_PRODUCT_LINKS_PER_PAGE:
+          break  # Both quotas full - the rest of the page's links would be dropped anyway
+
+      for link in same_product_links + other_links:
+        seen.add(link)
+        frontier.put_nowait((link, depth + 1))
+
+  async def crawl_product(root_url: str):
+    """Crawl one product tree with a pool of workers sharing a BFS frontier"""
+    frontier = asyncio.Queue()
+    frontier.put_nowait((root_url, 0))
+
+    async def worker():
+      while True:
+        url, depth = await frontier.get()
+        try:
+          await crawl_page(url, depth, frontier)
+        except Exception as e:
+          logger.error("Error crawling %s: %s", url, e)
+        finally:
+          frontier.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(CRAWL_CONCURRENCY)]
+    await frontier.join()
+    for task in workers:
+      task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+  await asyncio.gather(*(crawl_product(url) for url in start_urls))
+
+  logger.info("Crawling completed! Summary:")
   for product, count in product_page_counts.items():
-    logger.info(f"  {product}: {count} pages")
+    logger.info("  %s: %d pages", product, count)
   return all_pages
 
+PRODUCT_AREAS = (
+  'acquia-source', 'campaign-studio', 'content-optimization', 'conversion-optimization',
+  'customer-data-platform', 'acquia-cloud-platform', 'acquia-dam', 'drupal-starter-kits',
+  'site-factory', 'web-governance'
+)
+PRODUCT_AREA_RE = re.compile('/(' + '|'.join(re.escape(area) for area in PRODUCT_AREAS) + ')')
+
+@lru_cache(maxsize=65536)
 def get_product_area(url: str) -> str:
   """Determine which product area a URL belongs to"""
-  path = urlparse(url).path.lower()
-  if '/acquia-source' in path:
-    return 'acquia-source'
-  elif '/campaign-studio' in path:
-    return 'campaign-studio'
-  elif '/content-optimization' in path:
-    return 'content-optimization'
-  elif '/conversion-optimization' in path:
-    return 'conversion-optimization'
-  elif '/customer-data-platform' in path:
-    return 'customer-data-platform'
-  elif '/acquia-cloud-platform' in path:
-    return 'acquia-cloud-platform'
-  elif '/acquia-dam' in path:
-    return 'acquia-dam'
-  elif '/drupal-starter-kits' in path:
-    return 'drupal-starter-kits'
-  elif '/site-factory' in path:
-    return 'site-factory'
-  elif '/web-governance' in path:
-    return 'web-governance'
-  else:
-    return 'general'
+  match = PRODUCT_AREA_RE.search(cached_urlparse(url).path.lower())
+  # Interned, so every page of a product shares one string and grouping compares by identity
+  return sys.intern(match.group(1)) if match else 'general'
 
+# Keyword tables for is_memcached_related_query. Matching is by substring of the
+# lowercased query, so 'cache' already covers 'memcache'/'memcached' and 'settings'
+# covers 'settings.php' - only the shortest distinct keywords are kept.
+MEMCACHE_INDICATORS = ('cache', 'caching')
+SETTINGS_INDICATORS = ('settings', 'config')
+ACTION_INDICATORS   = ('enable', 'enabling', 'configure', 'setup', 'install', 'add', 'integration')
+# Each demo phrase contains 'cache', which is_memcached_related_query relies on
+DEMO_PHRASES        = (
+  'enable memcached',
+  'memcache integration',
+  'memcached settings',
+  'cache backend',
+  'acquia memcache',
+  'cloud classic memcache'
+)
+
+@lru_cache(maxsize=1024)
 def is_memcached_related_query(query: str) -> bool:
   """Detect if a query is related to Memcached configuration"""
   query_lower = query.lower()
   
-  # Primary indicators for Memcached queries
-  memcache_indicators = [
-    'memcache', 'memcached', 'cache', 'caching'
-  ]
-  
-  # Settings.php file indicators
-  settings_indicators = [
-    'settings.php', 'settings', 'configuration', 'config'
-  ]
-  
-  # Cloud platform indicators
-  platform_indicators = [
-    'cloud classic', 'cloud platform', 'acquia', 'hosting'
-  ]
-  
-  # Action indicators
-  action_indicators = [
-    'enable', 'enabling', 'configure', 'setup', 'install', 'add', 'integration'
-  ]
-  
-  # Check for combinations that indicate Memcached configuration
-  has_memcache = any(indicator in query_lower for indicator in memcache_indicators)
-  has_settings = any(indicator in query_lower for indicator in settings_indicators)
-  has_action = any(indicator in query_lower for indicator in action_indicators)
+  # Every combination below and every demo phrase contains a cache keyword, so
+  # most queries are rejected by this one check
+  if not any(indicator in query_lower for indicator in MEMCACHE_INDICATORS):
+    return False
   
   # High confidence: memcache + settings.php
-  if has_memcache and has_settings:
+  if any(indicator in query_lower for indicator in SETTINGS_INDICATORS):
     return True
   
   # Medium confidence: memcache + enable/configure
-  if has_memcache and has_action:
+  if any(indicator in query_lower for indicator in ACTION_INDICATORS):
     return True
   
   # Check for specific phrases that indicate our demo scenario
-  demo_phrases = [
-    'enable memcached',
-    'memcache integration',
-    'memcached settings',
-    'cache backend',
-    'acquia memcache',
-    'cloud classic memcache'
-  ]
-  
-  if any(phrase in query_lower for phrase in demo_phrases):
-    return True
-  
-  return False
+  return any(phrase in query_lower for phrase in DEMO_PHRASES)
 
 def get_memcached_doc_data() -> dict:
   """Return pre-loaded Memcached documentation data"""
-  return {
-    'url': MEMCACHED_DOC_URL,
-    'title': 'Enabling Memcached on Cloud Platform',
-    'content': MEMCACHED_DOC_CONTENT,
-    'links': [],
-    'success': True
-  }
+  return dict(MEMCACHED_DOC_DATA)
 
 def calculate_relevance(query: str, page_data: dict) -> int:
   """Calculate relevance score for a page based on query"""
   query_lower   = query.lower()
   query_words   = query_lower.split()
-  content_lower = page_data['content'].lower()
-  title_lower   = page_data['title'].lower()
+  content_lower = page_data.get('content_lower') or page_data['content'].lower()
+  title_lower   = page_data.get('title_lower') or page_data['title'].lower()
   
   # Base scoring
   title_exact_match   = 10 if query_lower in title_lower else 0
@@ -446,46 +870,56 @@ def calculate_relevance(query: str, page_data: dict) -> int:
   
   return base_score
 
-def extract_snippet(query: str, content: str, max_length: int = 300) -> str:
-  """Extract relevant snippet from content based on query"""
+@lru_cache(maxsize=256)
+def query_words_re(query: str):
+  """Case-insensitive pattern matching any of the query's words, or None for an empty query"""
   query_words = query.lower().split()
-  sentences = content.split('.')
+  if not query_words:
+    return None
+  return re.compile('|'.join(re.escape(word) for word in query_words), re.IGNORECASE)
+
+def extract_snippet(query: str, page_data: dict, max_length: int = 300) -> str:
+  """Extract relevant snippet from a page's sentences based on query"""
+  pattern = query_words_re(query)
+  if pattern is None:
+    return ""
   relevant_sentences = []
   
-  for sentence in sentences:
-    sentence_lower = sentence.lower()
-    if any(word in sentence_lower for word in query_words):
+  for sentence in page_data['sentences']:
+    if pattern.search(sentence):
       relevant_sentences.append(sentence.strip())
       if len(relevant_sentences) >= 2:
         break
   
-  snippet = '. '.join(relevant_sentences) + '.' if relevant_sentences else ""
+  snippet = ' '.join(relevant_sentences)
   return snippet[:max_length] + "..." if len(snippet) > max_length else snippet
 
 def search_in_pages(query: str, pages: dict) -> list:
   """Search across all crawled pages with improved scoring"""
-  results = []
+  scored = []
   for url, page_data in pages.items():
     score = calculate_relevance(query, page_data)
     if score > 0:
-      results.append({
-        'url': url,
-        'title': page_data['title'],
-        'relevance': score,
-        'excerpts': extract_relevant_paragraphs(query, page_data['content'])
-      })
-  results.sort(key=lambda x: x['relevance'], reverse=True)
-  return results[:10]
-
-def extract_relevant_paragraphs(query: str, content: str, max_paragraphs: int = 3) -> list:
-  """Extract relevant paragraphs from content based on query"""
-  query_words = query.lower().split()
-  paragraphs = [p.strip() for p in content.split('\n') if len(p.strip()) > 30]
+      scored.append((score, url, page_data))
+  
+  # Only the top results are returned, so only they need excerpts
+  top = heapq.nlargest(10, scored, key=lambda x: x[0])
+  return [{
+    'url': url,
+    'title': page_data['title'],
+    'relevance': score,
+    'excerpts': extract_relevant_paragraphs(query, page_data)
+  } for score, url, page_data in top]
+
+def extract_relevant_paragraphs(query: str, page_data: dict, max_paragraphs: int = 3, min_length: int = 30) -> list:
+  """Extract relevant paragraphs longer than min_length from a page based on query"""
+  pattern = query_words_re(query)
+  if pattern is None:
+    return []
   relevant_paras = []
   
-  for para in paragraphs:
-    para_lower = para.lower()
-    if any(word in para_lower for word in query_words):
+  for para in page_data['paragraphs']:
+    if len(para) > min_length and pattern.search(para):
       relevant_paras.append(para)
       if len(relevant_paras) >= max_paragraphs:
         break
@@ -504,39 +938,48 @@ async def list_resources() -> list[Resource]:
   if MEMCACHED_DOC_URL not in page_cache:
     initialize_memcached_cache()
   
+  # Resource objects are built once per cached page and dropped with it on eviction
   resources = []
   for url, page_data in page_cache.items():
-    resources.append(
-      Resource(
+    resource = page_data.get('resource')
+    if resource is None:
+      resource = page_data['resource'] = Resource(
         uri=f"drupal://{url}",
         name=page_data['title'],
         mimeType="text/plain",
         description=f"Documentation: {page_data['title']}"
       )
-    )
+    resources.append(resource)
   return resources
 
+def render_resource_text(url: str, page_data: dict) -> str:
+  """Resource text for a page, rendered on first read and kept on page_data"""
+  rendered = page_data.get('rendered')
+  if rendered is None:
+    rendered = page_data['rendered'] = f"# {page_data['title']}\n\nSource: {url}\n\n{page_data['content']}"
+  return rendered
+
 @app.read_resource()
 async def read_resource(uri: str) -> str:
   url = uri.replace("drupal://", "")
   
-  # Handle Memcached documentation specially
+  # Memcached documentation is served from the pre-rendered constant
   if url == MEMCACHED_DOC_URL:
-    if url not in page_cache:
-      initialize_memcached_cache()
-    page_data = page_cache[url]
-    return f"# {page_data['title']}\n\nSource: {url}\n\n{page_data['content']}"
+    return MEMCACHED_RESOURCE_TEXT
   
-  if url in page_cache:
-    page_data = page_cache[url]
-    return f"# {page_data['title']}\n\nSource: {url}\n\n{page_data['content']}"
+  page_data = get_cached_page(url)
+  if page_data is not None:
+    return render_resource_text(url, page_data)
   
-  page_data = fetch_page(url)
+  page_data = await fetch_page(url)
   if page_data['success']:
-    return f"# {page_data['title']}\n\nSource: {url}\n\n{page_data['content']}"
+    return render_resource_text(url, page_data)
   return f"Content not available for {url}"
 
 # ========== TOOLS (For explicit searches) ==========
+# Shared reply for the listing tools while nothing is cached
+NO_CACHED_PAGES = TextContent(type="text", text="No cached pages. Run refresh_docs or crawl_docs first.")
+
 @app.list_tools()
 async def list_tools() -> list[Tool]:
   """Tools for explicit searches if needed"""
@@ -586,10 +1029,13 @@ async def list_tools() -> list[Tool]:
     ),
     Tool(
       name="list_cached_urls",
-      description="Show all currently cached documentation URLs",
+      description="Show currently cached documentation URLs, a page at a time",
       inputSchema={
         "type": "object",
-        "properties": {},
+        "properties": {
+          "limit": {"type": "integer", "description": "Maximum number of URLs to show", "default": LIST_PAGE_SIZE},
+          "offset": {"type": "integer", "description": "Number of cached URLs to skip", "default": 0}
+        },
         "required": []
       }
     ),
@@ -630,18 +1076,31 @@ def smart_memcached_injection(query: str, results: list) -> list:
       memcached_result = {
         'title': memcached_data['title'],
         'url': memcached_data['url'],
-        'snippet': extract_snippet(query, memcached_data['content']),
+        'snippet': extract_snippet(query, memcached_data),
         'content': memcached_data['content'],
+        'paragraphs': memcached_data['paragraphs'],
         'relevance': relevance_score
       }
       
       # Insert at the beginning since it's highly relevant for Memcached queries
       results.insert(0, memcached_result)
-      logger.info(f"🎯 Auto-injected Memcached documentation for query: '{query}' (score: {relevance_score})")
+      logger.info("🎯 Auto-injected Memcached documentation for query: '%s' (score: %s)", query, relevance_score)
   
   return results
 
-def direct_search_docs(query: str) -> list:
+async def fetch_pages(urls) -> dict:
+  """Fetch pages concurrently, each distinct URL once, and map URL -> page_data"""
+  unique_urls = list(dict.fromkeys(urls))
+  # Stay within the connector's per-host limit - requests queued for a pooled
+  # connection spend their 15s timeout waiting and fail as network errors
+  semaphore = asyncio.Semaphore(CRAWL_CONCURRENCY)
+  async def fetch_bounded(url):
+    async with semaphore:
+      return await fetch_page(url)
+  fetched = await asyncio.gather(*(fetch_bounded(url) for url in unique_urls))
+  return dict(zip(unique_urls, fetched))
+
+async def direct_search_docs(query: str) -> list:
   """Direct search using fetch_page function with comprehensive URL coverage"""
   try:
     # Comprehensive list of documentation entry points
@@ -657,91 +1116,101 @@ def direct_search_docs(query: str) -> list:
       "https://docs.acquia.com/site-factory",
       "https://docs.acquia.com/web-governance"
     ]
+    # Every URL that has entered the search, so none is fetched or reported twice
+    seen_urls = set(doc_urls)
     
     # Use Acquia's own search functionality to discover relevant pages
-    search_url = f"https://docs.acquia.com/search/?q={requests.utils.quote(query)}"
-    logger.info(f"Attempting to fetch search results from Acquia search: {search_url}")
+    search_url = acquia_search_url(query)
+    logger.info("Attempting to fetch search results from Acquia search: %s", search_url)
     
     # Try to extract search results from Acquia's search page
     try:
-      headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-      }
-      search_response = requests.get(search_url, headers=headers, timeout=10)
-      if search_response.status_code == 200:
-        search_soup = BeautifulSoup(search_response.text, 'html.parser')
+      import aiohttp
+      search_response = await get_with_retries(search_url, timeout=aiohttp.ClientTimeout(total=10))
+      async with search_response:
+        search_body = await search_response.read() if search_response.status == 200 else None
+      if search_body is not None:
+        from bs4 import BeautifulSoup
+        search_soup = BeautifulSoup(search_body, 'lxml', parse_only=link_strainer())
         
         # Extract search result links
         search_result_links = []
         for link in search_soup.find_all('a', href=True):
           href = link['href']
-          full_url = urljoin(DRUPAL_BASE_URL, href)
-          if is_docs_url(full_url) and full_url not in doc_urls:
+          if NON_PAGE_HREF_RE.match(href):
+            continue
+          full_url = cached_urljoin(DRUPAL_BASE_URL, href)
+          if is_docs_url(full_url) and full_url not in seen_urls:
+            seen_urls.add(full_url)
             search_result_links.append(full_url)
             if len(search_result_links) >= 20:  # Limit to top 20 search results
               break
         
         if search_result_links:
-          logger.info(f"Found {len(search_result_links)} additional URLs from Acquia search")
+          logger.info("Found %d additional URLs from Acquia search", len(search_result_links))
           doc_urls.extend(search_result_links)
     except Exception as search_error:
-      logger.warning(f"Could not fetch from Acquia search page: {search_error}")
+      logger.warning("Could not fetch from Acquia search page: %s", search_error)
     
-    results = []
-    logger.info(f"Searching for '{query}' in {len(doc_urls)} documentation pages...")
+    logger.info("Searching for '%s' in %d documentation pages...", query, len(doc_urls))
+    
+    # First pass: fetch all known URLs at once - the shared session bounds connections per host
+    pages = await fetch_pages(doc_urls)
     
-    # First pass: search known URLs
+    # Score them and pick the linked pages worth exploring from each
+    first_pass = []  # (url, page_data, score, linked_urls)
     for url in doc_urls:
-      logger.debug(f"Checking: {url}")
-      page_data = fetch_page(url)
-      
-      if page_data['success']:
-        score = calculate_relevance(query, page_data)
-        if score > 0:
-          results.append({
-            'title': page_data['title'],
-            'url': url,
-            'snippet': extract_snippet(query, page_data['content']),
-            'content': page_data['content'],
-            'relevance': score
-          })
-          logger.info(f"Found relevant content in: {page_data['title']} (score: {score})")
-            
-          # Second pass: check linked pages from high-scoring results
-          if score > 50 and page_data.get('links'):
-            logger.info(f"Exploring {len(page_data['links'])} linked pages from high-scoring result...")
-            for linked_url in page_data['links'][:20]:  # Increased to check more links
-              if linked_url not in doc_urls:  # Avoid duplicates
-                linked_page = fetch_page(linked_url)
-                if linked_page['success']:
-                  linked_score = calculate_relevance(query, linked_page)
-                  if linked_score > 0:
-                    results.append({
-                      'title': linked_page['title'],
-                      'url': linked_url,
-                      'snippet': extract_snippet(query, linked_page['content']),
-                      'content': linked_page['content'],
-                      'relevance': linked_score
-                    })
-        # Even for low-scoring or non-matching pages, explore their links if they're product overview pages
-        elif page_data['success'] and page_data.get('links') and any(product in url for product in ['overview', 'web-governance']):
-          logger.info(f"Exploring links from overview page: {page_data['title']}")
-          for linked_url in page_data['links'][:30]:  # Check more links from overview pages
-            if linked_url not in [r.get('url') for r in results]:  # Avoid duplicates
-              linked_page = fetch_page(linked_url)
-              if linked_page['success']:
-                linked_score = calculate_relevance(query, linked_page)
-                if linked_score > 0:
-                  results.append({
-                    'title': linked_page['title'],
-                    'url': linked_url,
-                    'snippet': extract_snippet(query, linked_page['content']),
-                    'content': linked_page['content'],
-                    'relevance': linked_score
-                  })
-      else:
-        logger.warning(f"Failed to fetch: {url} - {page_data['content']}")
+      page_data = pages[url]
+      if not page_data['success']:
+        logger.warning("Failed to fetch: %s - %s", url, page_data['content'])
+        continue
+      score = calculate_relevance(query, page_data)
+      linked_urls = []
+      if score > 0:
+        # Second pass: check linked pages from high-scoring results
+        if score > 50 and page_data.get('links'):
+          logger.info("Exploring %d linked pages from high-scoring result...", len(page_data['links']))
+          linked_urls = page_data['links'][:20]  # Increased to check more links
+      # Even for low-scoring or non-matching pages, explore their links if they're product overview pages
+      elif page_data.get('links') and any(product in url for product in ['overview', 'web-governance']):
+        logger.info("Exploring links from overview page: %s", page_data['title'])
+        linked_urls = page_data['links'][:30]  # Check more links from overview pages
+      # Avoid duplicates
+      linked_urls = [linked_url for linked_url in linked_urls if linked_url not in seen_urls]
+      seen_urls.update(linked_urls)
+      first_pass.append((url, page_data, score, linked_urls))
+    
+    # Second pass: fetch every linked page in one batch
+    linked_pages = await fetch_pages(
+      linked_url for _, _, _, linked_urls in first_pass for linked_url in linked_urls
+    )
+    
+    # Assemble results in page order, each page followed by its linked pages
+    results = []
+    for url, page_data, score, linked_urls in first_pass:
+      if score > 0:
+        results.append({
+          'title': page_data['title'],
+          'url': url,
+          'snippet': extract_snippet(query, page_data),
+          'content': page_data['content'],
+          'paragraphs': page_data['paragraphs'],
+          'relevance': score
+        })
+        logger.info("Found relevant content in: %s (score: %s)", page_data['title'], score)
+      for linked_url in linked_urls:
+        linked_page = linked_pages[linked_url]
+        if linked_page['success']:
+          linked_score = calculate_relevance(query, linked_page)
+          if linked_score > 0:
+            results.append({
+              'title': linked_page['title'],
+              'url': linked_url,
+              'snippet': extract_snippet(query, linked_page),
+              'content': linked_page['content'],
+              'paragraphs': linked_page['paragraphs'],
+              'relevance': linked_score
+            })
     
     results.sort(key=lambda x: x['relevance'], reverse=True)
     
@@ -751,17 +1220,17 @@ def direct_search_docs(query: str) -> list:
     if not results:
       return [{
         'title': f'No results found for "{query}"',
-        'url': f'https://docs.acquia.com/search/?q={requests.utils.quote(query)}',
+        'url': acquia_search_url(query),
         'snippet': f'No matching content found in the documentation for "{query}". Try the manual search link or use different keywords.',
         'content': '',
         'relevance': 0
       }]
     return results[:10]
   except Exception as e:
-    logger.error(f"Error in direct search: {str(e)}")
+    logger.error("Error in direct search: %s", e)
     return [{
       'title': f'Search Error for "{query}"',
-      'url': f'https://docs.acquia.com/search/?q={requests.utils.quote(query)}',
+      'url': acquia_search_url(query),
       'snippet': f'Search encountered an error: {str(e)}. You can try the search manually at the provided URL.',
       'content': '',
       'relevance': 0
@@ -777,10 +1246,10 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     # Combine context and requirements into a comprehensive query
     combined_query = f"{context} {requirements}"
     
-    logger.info(f"🎯 Intelligent guidance request - Context: '{context}', Requirements: '{requirements}'")
+    logger.info("🎯 Intelligent guidance request - Context: '%s', Requirements: '%s'", context, requirements)
     
     # Use the enhanced search with auto-injection
-    results = direct_search_docs(combined_query)
+    results = await direct_search_docs(combined_query)
     
     if not results:
       return [TextContent(
@@ -796,16 +1265,10 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     if is_memcached_related_query(combined_query):
       output += "🚀 **Detected: Memcached Configuration Request**\n\n"
       output += "**Quick Solution for Cloud Classic Memcached Integration:**\n\n"
-      # Extract the most relevant code snippet for settings.php
-      memcached_data = get_memcached_doc_data()
       output += f"📖 **Source Documentation:** {MEMCACHED_DOC_URL}\n\n"
-      
-      if 'require_once' in memcached_data['content']:
-        code_start = memcached_data['content'].find('```php')
-        code_end = memcached_data['content'].find('```', code_start + 6)
-        if code_start != -1 and code_end != -1:
-          code_snippet = memcached_data['content'][code_start:code_end + 3]
-          output += f"{code_snippet}\n\n"
+      # Include the settings.php code snippet (extracted once at startup)
+      if MEMCACHED_SETTINGS_SNIPPET:
+        output += f"{MEMCACHED_SETTINGS_SNIPPET}\n\n"
     output += f"📚 **Found {len(results)} relevant documentation sources:**\n\n"
     
     for i, result in enumerate(results, 1):
@@ -828,8 +1291,8 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
       
   elif name == "search_docs":
     query = arguments["query"]
-    logger.info(f"Searching directly for: {query}")
-    results = direct_search_docs(query)
+    logger.info("Searching directly for: %s", query)
+    results = await direct_search_docs(query)
     if not results:
       return [TextContent(
           type="text",
@@ -842,15 +1305,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
       if result['snippet']:
           output += f"   📝 **Summary:** {result['snippet']}\n"
       if result['content']:
-        query_words = query.lower().split()
-        paragraphs = [p.strip() for p in result['content'].split('\n') if len(p.strip()) > 50]
-        relevant_paras = []
-        for para in paragraphs:
-          para_lower = para.lower()
-          if any(word in para_lower for word in query_words):
-            relevant_paras.append(para)
-            if len(relevant_paras) >= 2:
-              break
+        relevant_paras = extract_relevant_paragraphs(query, result, max_paragraphs=2, min_length=50)
         if relevant_paras:
           output += f"\n   📄 **Key Content:**\n"
           for excerpt in relevant_paras:
@@ -861,79 +1316,80 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     return [TextContent(type="text", text=output)]
   elif name == "crawl_docs":
     max_depth = arguments.get("max_depth", MAX_CRAWL_DEPTH)
-    logger.info(f"Starting dynamic crawl with max_depth={max_depth}...")
-    crawled_pages = crawl_docs(max_depth=max_depth)
+    logger.info("Starting dynamic crawl with max_depth=%s...", max_depth)
+    crawled_pages = await crawl_docs(max_depth=max_depth)
     added_count = 0
     for url, page_data in crawled_pages.items():
-      if url not in page_cache and len(page_cache) < CACHE_SIZE:
-        page_cache[url] = page_data
+      if url not in page_cache:
+        add_to_cache(url, page_data)
         added_count += 1
     summary = f"✅ Crawled {len(crawled_pages)} pages. Added {added_count} new pages to cache. Cache now has {len(page_cache)} pages."
     return [TextContent(type="text", text=summary)]
   elif name == "refresh_docs":
     page_cache.clear()
-    url_to_cache_key.clear()
-    discovered_urls.clear()
+    tool_output_cache.clear()
+    product_index.clear()
+    parsed_pages.clear()
     return [TextContent(
       type="text",
       text="✅ Cache cleared! Using direct search - no pre-crawling needed."
     )]
   elif name == "list_cached_urls":
     if not page_cache:
-      return [TextContent(
-        type="text",
-        text="No cached pages. Run refresh_docs or crawl_docs first."
-      )]
-    output = f"📚 **Cached Documentation Pages ({len(page_cache)} total):**\n\n"
-    for i, (url, page_data) in enumerate(page_cache.items(), 1):
-      output += f"{i}. **{page_data['title']}**\n"
-      output += f"   🔗 {url}\n"
-      content_preview = page_data['content'][:100].replace('\n', ' ')
-      output += f"   📄 {content_preview}...\n\n"
+      return [NO_CACHED_PAGES]
+    limit = max(int(arguments.get("limit", LIST_PAGE_SIZE)), 1)
+    offset = max(int(arguments.get("offset", 0)), 0)
+    
+    # The listing is only rebuilt after page_cache has changed
+    cache_key = (name, offset, limit)
+    output = tool_output_cache.get(cache_key)
+    if output is None:
+      total = len(page_cache)
+      parts = [f"📚 **Cached Documentation Pages ({total} total):**\n\n"]
+      items = list(islice(page_cache.items(), offset, offset + limit))
+      for i, (url, page_data) in enumerate(items, offset + 1):
+        # Slice before replacing, so only the preview is ever scanned or copied
+        content_preview = page_data['content'][:100].replace('\n', ' ')
+        parts.append(f"{i}. **{page_data['title']}**\n   🔗 {url}\n   📄 {content_preview}...\n\n")
+      shown_until = offset + len(items)
+      if shown_until < total:
+        parts.append(f"... showing {offset + 1}-{shown_until} of {total}. Pass offset={shown_until} for more.\n")
+      elif not items:
+        parts.append(f"No cached pages at offset {offset}.\n")
+      output = tool_output_cache[cache_key] = "".join(parts)
     return [TextContent(type="text", text=output)]
   elif name == "crawl_stats":
     if not page_cache:
-      return [TextContent(
-        type="text",
-        text="No cached pages. Run refresh_docs or crawl_docs first."
-      )]
-    product_stats = {}
-    for url, page_data in page_cache.items():
-      product = get_product_area(url)
-      if product not in product_stats:
-        product_stats[product] = []
-      product_stats[product].append({
-        'url': url,
-        'title': page_data['title']
-      })
-    output = f"📊 **Crawling Statistics ({len(page_cache)} total pages):**\n\n"
-    for product, pages in sorted(product_stats.items()):
-      output += f"**{product.title().replace('-', ' ')}** ({len(pages)} pages):\n"
-      for page in pages[:5]:
-          output += f"  • {page['title']}\n    {page['url']}\n"
-      if len(pages) > 5:
-          output += f"  ... and {len(pages) - 5} more pages\n"
-      output += "\n"
+      return [NO_CACHED_PAGES]
+    # The statistics are only rebuilt after page_cache has changed
+    output = tool_output_cache.get(name)
+    if output is None:
+      # product_index already groups the cached pages, so only the first five
+      # of each product are visited
+      parts = [f"📊 **Crawling Statistics ({len(page_cache)} total pages):**\n\n"]
+      for product in sorted(product_index):
+        pages = product_index[product]
+        parts.append(f"**{product.title().replace('-', ' ')}** ({len(pages)} pages):\n")
+        parts.extend(f"  • {title}\n    {url}\n" for url, title in islice(pages.items(), 5))
+        extra = len(pages) - 5
+        if extra > 0:
+          parts.append(f"  ... and {extra} more pages\n")
+        parts.append("\n")
+      output = tool_output_cache[name] = "".join(parts)
     return [TextContent(type="text", text=output)]
   elif name == "get_source_link":
     query = arguments["query"]
-    source_url = get_source_links_for_query(query)
-    
-    output = f"🔗 **Official Acquia Documentation Source:**\n\n"
-    output += f"**Query:** {query}\n"
-    output += f"**Source Link:** {source_url}\n\n"
+    # A query that is itself a cached documentation URL is its own source
+    source_url = query if query in page_cache else await get_source_links_for_query(query)
     
     # If it's a Memcached-related query, provide additional context
-    if is_memcached_related_query(query):
-      output += f"**Topic:** Memcached Integration for Cloud Classic\n"
-      output += f"**Documentation Title:** Enabling Memcached on Cloud Platform\n"
-      output += f"**Direct Link:** {MEMCACHED_DOC_URL}\n\n"
-      output += "This documentation contains the official Acquia guidance for:\n"
-      output += "• Installing the Memcache module via Composer\n"
-      output += "• Adding acquia/memcache-settings package\n"
-      output += "• Configuring settings.php with the proper require_once statement\n"
-      output += "• Cloud Classic vs Cloud Next differences\n"
-    
+    memcached_context = MEMCACHED_SOURCE_CONTEXT if is_memcached_related_query(query) else ""
+    output = (
+      f"🔗 **Official Acquia Documentation Source:**\n\n"
+      f"**Query:** {query}\n"
+      f"**Source Link:** {source_url}\n\n"
+      f"{memcached_context}"
+    )
     return [TextContent(type="text", text=output)]
   raise ValueError(f"Unknown tool: {name}")
 
@@ -945,12 +1401,16 @@ async def main():
   logger.info("🚀 Acquia Docs MCP server started! Using direct search - ready for instant documentation queries.")
   logger.info("🔌 Connect to this MCP server at: stdio://drupal-docs")
   
-  async with stdio_server() as (read_stream, write_stream):
-    await app.run(
-      read_stream,
-      write_stream,
-      app.create_initialization_options()
-    )
+  try:
+    async with stdio_server() as (read_stream, write_stream):
+      await app.run(
+        read_stream,
+        write_stream,
+        app.create_initialization_options()
+      )
+  finally:
+    await close_session()
+    close_db()
 
 if __name__ == "__main__":
   asyncio.run(main())
\ No newline at end of file